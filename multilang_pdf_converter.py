@@ -1,3 +1,396 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+# Get current script directory
+script_dir = os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else os.getcwd()
+
+# Language to font mapping
+LANGUAGE_FONTS = {
+    'hindi': {
+        'default_font': 'NotoSansDevanagari-Regular.ttf',
+        'font_name': 'Devanagari',
+        'requires_special_font': True
+    },
+    'english': {
+        'default_font': 'Helvetica',
+        'font_name': 'Helvetica',
+        'requires_special_font': False
+    },
+    'tamil': {
+        'default_font': 'NotoSansTamil-Regular.ttf',
+        'font_name': 'Tamil',
+        'requires_special_font': True
+    },
+    'bengali': {
+        'default_font': 'NotoSansBengali-Regular.ttf',
+        'font_name': 'Bengali',
+        'requires_special_font': True
+    },
+    'gujarati': {
+        'default_font': 'NotoSansGujarati-Regular.ttf',
+        'font_name': 'Gujarati',
+        'requires_special_font': True
+    },
+    'telugu': {
+        'default_font': 'NotoSansTelugu-Regular.ttf',
+        'font_name': 'Telugu',
+        'requires_special_font': True
+    },
+    'kannada': {
+        'default_font': 'NotoSansKannada-Regular.ttf',
+        'font_name': 'Kannada',
+        'requires_special_font': True
+    },
+    'malayalam': {
+        'default_font': 'NotoSansMalayalam-Regular.ttf',
+        'font_name': 'Malayalam',
+        'requires_special_font': True
+    },
+    'punjabi': {
+        'default_font': 'NotoSansGurmukhi-Regular.ttf',
+        'font_name': 'Punjabi',
+        'requires_special_font': True
+    }
+}
+
+# Listed in the unsupported-language error
+_SUPPORTED_LANGS_CSV = ', '.join(LANGUAGE_FONTS)
+
+# Common font search locations
+FONT_SEARCH_PATHS = (
+    script_dir,  # Current directory
+    os.path.join(script_dir, 'fonts'),  # fonts subfolder
+    os.path.join(script_dir, '..', 'fonts'),  # parent fonts folder
+    '/usr/share/fonts',  # Linux system fonts
+    '/System/Library/Fonts',  # macOS system fonts
+    'C:\\Windows\\Fonts',  # Windows system fonts
+)
+
+# Subfolders checked inside each search location ('' = the location itself)
+FONT_SEARCH_SUBDIRS = (
+    '',
+    'truetype',
+    os.path.join('truetype', 'noto'),
+    'opentype',
+    os.path.join('opentype', 'noto'),
+    'noto',
+)
+
+# Resolved font file per (language, font_path) and font file registered per
+# reportlab font name, so repeated conversions skip the disk search and TTF parse
+_FONT_PATH_CACHE = {}
+_REGISTERED_FONTS = {}
+
+# Glyph width tables per (font name, font size), kept across conversions
+_GLYPH_WIDTH_CACHE = {}
+
+# Codepoints where WinAnsi (standard Type 1 font) codes equal Unicode
+LATIN_CODEPOINTS = tuple(range(32, 127)) + tuple(range(160, 256))
+
+# Marker the translator writes at the start of every page
+PAGE_MARKER = "--- Page"
+
+# Documents with at least this many pages are rendered across worker processes
+PARALLEL_MIN_PAGES = 200
+
+
+def _iter_pages(text_content):
+    """Yield the text between page markers, like str.split but without building a list"""
+    start = 0
+    while True:
+        end = text_content.find(PAGE_MARKER, start)
+        if end < 0:
+            yield text_content[start:]
+            return
+        yield text_content[start:end]
+        start = end + len(PAGE_MARKER)
+
+
+def _iter_lines(page_content):
+    """Yield the lines of a page by slicing, without building a list of them"""
+    start = 0
+    while True:
+        end = page_content.find("\n", start)
+        if end < 0:
+            yield page_content[start:]
+            return
+        yield page_content[start:end]
+        start = end + 1
+
+
+class _GlyphWidths(dict):
+    """Width of each character at one font size, measured on first use"""
+    
+    def __init__(self, string_width, font_size):
+        super().__init__()
+        self._string_width = string_width
+        self._font_size = font_size
+        # Upper bound on the width of any character, if the font metrics give one
+        self.widest = None
+    
+    def __missing__(self, char):
+        char_width = self[char] = self._string_width(char, self._font_size)
+        return char_width
+
+
+def _optimal_breaks(word_widths, space_width, max_width):
+    """
+    Knuth-Plass total-fit line breaking (minimum raggedness)
+    
+    Args:
+        word_widths: Width of each word
+        space_width: Width of the space between words
+        max_width: Available line width
+    
+    Returns:
+        list: Index of the first word of each output line
+    """
+    word_count = len(word_widths)
+    cost = [0.0] + [float('inf')] * word_count  # best cost of laying out the first j words
+    line_start = [0] * (word_count + 1)
+    
+    for j in range(1, word_count + 1):
+        best_cost = float('inf')
+        best_start = j - 1
+        line_width = -space_width
+        for i in range(j - 1, -1, -1):
+            line_width += word_widths[i] + space_width
+            # A word wider than the line is allowed on a line of its own
+            if line_width > max_width and i < j - 1:
+                break
+            # Squared slack per line; the last line of a paragraph is free
+            if j == word_count or line_width >= max_width:
+                candidate = cost[i]
+            else:
+                candidate = cost[i] + (max_width - line_width) ** 2
+            if candidate < best_cost:
+                best_cost = candidate
+                best_start = i
+        cost[j] = best_cost
+        line_start[j] = best_start
+    
+    breaks = []
+    j = word_count
+    while j > 0:
+        j = line_start[j]
+        breaks.append(j)
+    breaks.reverse()
+    return breaks
+
+
+def _wrap_line(words, glyph_widths, max_width):
+    """
+    Word wrap of one line with evenly filled lines
+    
+    Args:
+        words: Words of the line
+        glyph_widths: Mapping of character to its width
+        max_width: Available line width
+    
+    Returns:
+        list: (first, last) word ranges, one per output line
+    """
+    # Lines too short to overflow even when set in the widest glyph need no measuring
+    if glyph_widths.widest is not None:
+        char_count = sum(map(len, words)) + len(words) - 1
+        if char_count * glyph_widths.widest <= max_width:
+            return [(0, len(words))]
+    
+    word_widths = [sum(map(glyph_widths.__getitem__, word)) for word in words]
+    
+    space_width = glyph_widths[" "]
+    if sum(word_widths) + space_width * (len(word_widths) - 1) <= max_width:
+        return [(0, len(words))]
+    
+    breaks = _optimal_breaks(word_widths, space_width, max_width)
+    return list(zip(breaks, breaks[1:] + [len(words)]))
+
+
+def _get_glyph_widths(font, font_size):
+    """Return the cached glyph width table for a registered reportlab font"""
+    cache_key = (font.fontName, font_size)
+    glyph_widths = _GLYPH_WIDTH_CACHE.get(cache_key)
+    
+    if glyph_widths is None:
+        glyph_widths = _GlyphWidths(font.stringWidth, font_size)
+        
+        scale = font_size / 1000.0
+        
+        # TrueType faces already carry a codepoint -> width table (in 1/1000 em)
+        char_widths = getattr(getattr(font, 'face', None), 'charWidths', None)
+        if char_widths:
+            glyph_widths.update((chr(code), width * scale) for code, width in char_widths.items())
+            # Characters missing from the table are drawn at the default width
+            glyph_widths.widest = max(max(char_widths.values()), font.face.defaultWidth) * scale
+        
+        # Standard Type 1 fonts (Helvetica for English) ship AFM widths per WinAnsi code,
+        # which matches Unicode for printable ASCII and Latin-1
+        elif getattr(font, 'encName', None) == 'WinAnsiEncoding':
+            for code in LATIN_CODEPOINTS:
+                glyph_widths[chr(code)] = font.widths[code] * scale
+            # Characters outside the encoding are measured in the substitution fonts
+            glyph_widths.widest = max(
+                max(sub_font.widths) for sub_font in [font] + list(getattr(font, 'substitutionFonts', []))
+            ) * scale
+        
+        _GLYPH_WIDTH_CACHE[cache_key] = glyph_widths
+    
+    return glyph_widths
+
+
+def _find_font_file(font_filename):
+    """Search the common font locations for a font file, or return None"""
+    for search_path in FONT_SEARCH_PATHS:
+        # One directory listing per location instead of a stat per candidate path
+        try:
+            with os.scandir(search_path) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            continue
+        
+        if font_filename in names:
+            return os.path.join(search_path, font_filename)
+        
+        # Only probe the Noto install folders that exist in this location
+        for sub_dir in FONT_SEARCH_SUBDIRS:
+            if sub_dir and sub_dir.split(os.sep)[0] in names:
+                test_path = os.path.join(search_path, sub_dir, font_filename)
+                if os.path.exists(test_path):
+                    return test_path
+    
+    return None
+
+
+def _register_font(font_name, font_file):
+    """Register a TTF font with reportlab unless this file is already registered"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    
+    if _REGISTERED_FONTS.get(font_name) == font_file:
+        return
+    pdfmetrics.registerFont(TTFont(font_name, font_file))
+    _REGISTERED_FONTS[font_name] = font_file
+    
+    # Widths measured for a previously registered file are stale now
+    for cache_key in [k for k in _GLYPH_WIDTH_CACHE if k[0] == font_name]:
+        del _GLYPH_WIDTH_CACHE[cache_key]
+
+
+def _render_pdf(pages_content, font_name, font_file=None):
+    """
+    Render page sections to PDF bytes
+    
+    Args:
+        pages_content: Iterable of page texts (split on the page marker)
+        font_name: Registered reportlab font name
+        font_file: TTF file to register first (needed in worker processes)
+    
+    Returns:
+        bytes: PDF data
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.pdfbase import pdfmetrics
+    
+    if font_file:
+        _register_font(font_name, font_file)
+    
+    # Create PDF (kept in memory and returned by getpdfdata, no file or buffer)
+    c = canvas.Canvas(None, pagesize=A4)
+    width, height = A4
+    
+    # Font settings
+    font_size = 11
+    max_width = width - 100
+    
+    # Per-character widths, looked up from a table shared across calls
+    glyph_widths = _get_glyph_widths(pdfmetrics.getFont(font_name), font_size)
+    
+    def begin_page():
+        # All lines of a page go into one text object (a single BT/ET block)
+        text_obj = c.beginText(50, height - 50)
+        text_obj.setFont(font_name, font_size, leading=16)
+        return text_obj
+    
+    def new_page(text_obj):
+        c.drawText(text_obj)
+        c.showPage()
+        return begin_page()
+    
+    for page_content in pages_content:
+        text_obj = None
+        blank_lines = 0
+        
+        for line in _iter_lines(page_content):
+            # Tokenize once; the wrap works on the word list
+            words = line.split()
+            if not words:
+                # Applied before the next text line, so leading and trailing blanks drop out
+                blank_lines += 1
+                continue
+            
+            if text_obj is None:
+                y = height - 50  # Start from top
+                text_obj = begin_page()
+                blank_lines = 0
+            
+            for _ in range(blank_lines):
+                if y < 50:  # New page if at bottom
+                    text_obj = new_page(text_obj)
+                    y = height - 50
+                text_obj.moveCursor(0, 8)
+                y -= 8  # Blank line
+            blank_lines = 0
+            
+            # Word wrap
+            for first, last in _wrap_line(words, glyph_widths, max_width):
+                if y < 50:
+                    text_obj = new_page(text_obj)
+                    y = height - 50
+                text_obj.textLine(" ".join(words[first:last]))
+                y -= 16
+        
+        if text_obj is not None:
+            c.drawText(text_obj)
+            c.showPage()  # New page for next section
+    
+    return c.getpdfdata()
+
+
+def _render_pdf_parallel(pages_content, font_name, font_file):
+    """Render chunks of pages in worker processes and merge them, or None if not possible"""
+    try:
+        import fitz  # PyMuPDF, only used to merge the rendered chunks
+    except ImportError:
+        return None
+    
+    workers = min(os.cpu_count() or 1, len(pages_content))
+    if workers < 2:
+        return None
+    
+    chunk_size = -(-len(pages_content) // workers)
+    chunks = [pages_content[i:i + chunk_size] for i in range(0, len(pages_content), chunk_size)]
+    
+    # reportlab is pure Python and holds the GIL, so this needs processes, not threads.
+    # spawn avoids forking the (multi-threaded) Streamlit server.
+    try:
+        with ProcessPoolExecutor(max_workers=len(chunks), mp_context=multiprocessing.get_context('spawn')) as executor:
+            parts = list(executor.map(_render_pdf, chunks, repeat(font_name), repeat(font_file)))
+    except (OSError, BrokenProcessPool):
+        return None
+    
+    merged = fitz.open()
+    for part in parts:
+        with fitz.open("pdf", part) as part_doc:
+            merged.insert_pdf(part_doc)
+    pdf_bytes = merged.tobytes(garbage=3, deflate=True)
+    merged.close()
+    return pdf_bytes
+
+
 def txt_to_pdf_multilang(text_content, target_language='english', font_path=None):
     """
     Convert TXT to PDF with multiple language support
@@ -11,126 +404,44 @@ def txt_to_pdf_multilang(text_content, target_language='english', font_path=None
         tuple: (pdf_bytes, error_message)
     """
     try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfgen import canvas
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        from io import BytesIO
-        import os
+        import reportlab  # the rendering helpers import what they need from it
         
     except ImportError:
         return None, "Please install reportlab: pip install reportlab"
     
-    # Get current script directory
-    script_dir = os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else os.getcwd()
-    
-    # Language to font mapping
-    LANGUAGE_FONTS = {
-        'hindi': {
-            'default_font': 'NotoSansDevanagari-Regular.ttf',
-            'font_name': 'Devanagari',
-            'requires_special_font': True
-        },
-        'english': {
-            'default_font': 'Helvetica',
-            'font_name': 'Helvetica',
-            'requires_special_font': False
-        },
-        'tamil': {
-            'default_font': 'NotoSansTamil-Regular.ttf',
-            'font_name': 'Tamil',
-            'requires_special_font': True
-        },
-        'bengali': {
-            'default_font': 'NotoSansBengali-Regular.ttf',
-            'font_name': 'Bengali',
-            'requires_special_font': True
-        },
-        'gujarati': {
-            'default_font': 'NotoSansGujarati-Regular.ttf',
-            'font_name': 'Gujarati',
-            'requires_special_font': True
-        },
-        'telugu': {
-            'default_font': 'NotoSansTelugu-Regular.ttf',
-            'font_name': 'Telugu',
-            'requires_special_font': True
-        },
-        'kannada': {
-            'default_font': 'NotoSansKannada-Regular.ttf',
-            'font_name': 'Kannada',
-            'requires_special_font': True
-        },
-        'malayalam': {
-            'default_font': 'NotoSansMalayalam-Regular.ttf',
-            'font_name': 'Malayalam',
-            'requires_special_font': True
-        },
-        'punjabi': {
-            'default_font': 'NotoSansGurmukhi-Regular.ttf',
-            'font_name': 'Punjabi',
-            'requires_special_font': True
-        }
-    }
-    
-    # Common font search locations
-    FONT_SEARCH_PATHS = [
-        script_dir,  # Current directory
-        os.path.join(script_dir, 'fonts'),  # fonts subfolder
-        os.path.join(script_dir, '..', 'fonts'),  # parent fonts folder
-        '/usr/share/fonts',  # Linux system fonts
-        '/System/Library/Fonts',  # macOS system fonts
-        'C:\\Windows\\Fonts',  # Windows system fonts
-    ]
-    
     try:
         # Normalize language input
         target_language = target_language.lower().strip()
         
         # Check if language is supported
         if target_language not in LANGUAGE_FONTS:
-            return None, f"Language '{target_language}' not supported. Supported languages: {', '.join(LANGUAGE_FONTS.keys())}"
+            return None, f"Language '{target_language}' not supported. Supported languages: {_SUPPORTED_LANGS_CSV}"
         
         lang_config = LANGUAGE_FONTS[target_language]
         
         # Register font if required
         if lang_config['requires_special_font']:
-            # Find font file
-            found_font = None
-            
-            # If custom font path provided, use it directly
-            if font_path:
-                if os.path.isabs(font_path) and os.path.exists(font_path):
-                    found_font = font_path
-                else:
-                    # Try relative to script directory
-                    test_path = os.path.join(script_dir, font_path)
-                    if os.path.exists(test_path):
-                        found_font = test_path
+            # Find font file (cached per language and custom path)
+            cache_key = (target_language, font_path)
+            found_font = _FONT_PATH_CACHE.get(cache_key)
             
-            # If not found, search for default font
             if not found_font:
-                font_filename = lang_config['default_font']
+                # If custom font path provided, use it directly
+                if font_path:
+                    if os.path.isabs(font_path) and os.path.exists(font_path):
+                        found_font = font_path
+                    else:
+                        # Try relative to script directory
+                        test_path = os.path.join(script_dir, font_path)
+                        if os.path.exists(test_path):
+                            found_font = test_path
                 
-                # Search in common locations
-                for search_path in FONT_SEARCH_PATHS:
-                    if not os.path.exists(search_path):
-                        continue
-                    
-                    # Direct file in search path
-                    test_path = os.path.join(search_path, font_filename)
-                    if os.path.exists(test_path):
-                        found_font = test_path
-                        break
-                    
-                    # Search recursively in fonts folders
-                    if 'fonts' in search_path.lower():
-                        for root, dirs, files in os.walk(search_path):
-                            if font_filename in files:
-                                found_font = os.path.join(root, font_filename)
-                                break
-                        if found_font:
-                            break
+                # If not found, search for default font
+                if not found_font:
+                    found_font = _find_font_file(lang_config['default_font'])
+                
+                if found_font:
+                    _FONT_PATH_CACHE[cache_key] = found_font
             
             # Check if font was found
             if not found_font:
@@ -145,74 +456,22 @@ def txt_to_pdf_multilang(text_content, target_language='english', font_path=None
                 )
                 return None, error_msg
             
-            # Register the font
+            # Register the font (skipped if this file is already registered)
             try:
-                pdfmetrics.registerFont(TTFont(lang_config['font_name'], found_font))
+                _register_font(lang_config['font_name'], found_font)
             except Exception as e:
                 return None, f"Error registering font '{found_font}': {str(e)}"
-        
-        # Create PDF
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        # Font settings
-        font_name = lang_config['font_name']
-        font_size = 11
-        
-        # Split content by pages if marked
-        if "--- Page" in text_content:
-            pages_content = text_content.split("--- Page")
         else:
-            pages_content = [text_content]
-        
-        for page_content in pages_content:
-            if not page_content.strip():
-                continue
-            
-            y = height - 50  # Start from top
-            
-            # Split into lines
-            lines = page_content.strip().split('\n')
-            
-            for line in lines:
-                if y < 50:  # New page if at bottom
-                    c.showPage()
-                    y = height - 50
-                
-                if line.strip():
-                    # Set the font
-                    c.setFont(font_name, font_size)
-                    
-                    # Word wrap
-                    max_width = width - 100
-                    words = line.split()
-                    current_line = ""
-                    
-                    for word in words:
-                        test_line = current_line + " " + word if current_line else word
-                        # Check width
-                        if c.stringWidth(test_line, font_name, font_size) > max_width and current_line:
-                            c.drawString(50, y, current_line)
-                            y -= 16
-                            current_line = word
-                            if y < 50:
-                                c.showPage()
-                                y = height - 50
-                        else:
-                            current_line = test_line
-                    
-                    if current_line:
-                        c.drawString(50, y, current_line)
-                        y -= 16
-                else:
-                    y -= 8  # Blank line
-            
-            c.showPage()  # New page for next section
+            found_font = None
         
-        c.save()
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
+        # Split content by pages if marked; long documents are rendered in parallel
+        pages_content = _iter_pages(text_content)
+        pdf_bytes = None
+        if text_content.count(PAGE_MARKER) >= PARALLEL_MIN_PAGES:
+            pages_content = [page for page in pages_content if page and not page.isspace()]
+            pdf_bytes = _render_pdf_parallel(pages_content, lang_config['font_name'], found_font)
+        if pdf_bytes is None:
+            pdf_bytes = _render_pdf(pages_content, lang_config['font_name'])
         
         return pdf_bytes, None
         
@@ -220,6 +479,31 @@ def txt_to_pdf_multilang(text_content, target_language='english', font_path=None
         return None, f"Error creating PDF: {str(e)}"
 
 
+def txt_to_pdf_multilang_stream(text_content, target_language='english', font_path=None, chunk_size=65536):
+    """
+    Convert TXT to PDF and hand the result out in chunks
+    
+    reportlab assembles the whole document before writing it, so the PDF is
+    built once in memory; the chunks are zero-copy views of it, which lets the
+    caller write to a file or socket without another full-size copy.
+    
+    Args:
+        text_content: Text to convert to PDF
+        target_language: Language of the text (see txt_to_pdf_multilang)
+        font_path: Custom font path (optional)
+        chunk_size: Size of each yielded chunk in bytes
+    
+    Returns:
+        tuple: (iterator of memoryview chunks, error_message)
+    """
+    pdf_bytes, error = txt_to_pdf_multilang(text_content, target_language, font_path)
+    if error:
+        return None, error
+    
+    pdf_view = memoryview(pdf_bytes)
+    return (pdf_view[i:i + chunk_size] for i in range(0, len(pdf_view), chunk_size)), None
+
+
 # Example usage:
 if __name__ == "__main__":
     # Hindi example
@@ -0,0 +1,196 @@
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Page ranges with at least this many pages are rendered across worker processes
+RENDER_PARALLEL_MIN_PAGES = 8
+# Pages per task handed to a worker process
+RENDER_PARALLEL_RANGE_PAGES = 4
+# Rendering only has to stay ahead of the API calls; more workers just
+# cost another interpreter and PyMuPDF instance each
+RENDER_PARALLEL_MAX_WORKERS = 4
+
+# Vision models downscale larger images, so render every page to about this many
+# pixels on its long edge (1.5x, or 108 dpi, for A4) rather than at a fixed zoom
+RENDER_LONG_EDGE_PX = 1280
+RENDER_MIN_ZOOM = 1.0
+RENDER_MAX_ZOOM = 3.0
+JPEG_QUALITY = 85
+
+# Pages without a text layer and with less than this share of ink pixels (0.002%, a
+# few specks of dust; a lone "I" is about twice that) are treated as blank and not
+# sent for translation
+BLANK_MAX_INK = 0.00002
+# Grey levels further than this from the page's background level count as ink, so
+# light or coloured text on any paper tone does too
+BLANK_INK_CONTRAST = 24
+
+# A text layer with fewer characters than this (a scan's page number, say) isn't
+# worth using instead of the image
+TEXT_LAYER_MIN_CHARS = 50
+
+
+def _encode_jpeg(pix):
+    """
+    Encode an RGB pixmap as JPEG
+    
+    Pillow's libjpeg-turbo is several times faster than PyMuPDF's own JPEG
+    encoder, and wraps the pixmap's samples without copying them.
+    
+    Args:
+        pix: fitz.Pixmap without alpha
+    
+    Returns:
+        bytes: JPEG data
+    """
+    image = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _is_blank(page, pix):
+    """Whether a page has no text layer and (next to) no ink on its rendered image"""
+    if page.get_text("text").strip():
+        return False
+    gray = pix if pix.n == 1 else fitz.Pixmap(fitz.csGRAY, pix)
+    histogram = Image.frombuffer("L", (gray.width, gray.height), gray.samples_mv, "raw", "L", gray.stride, 1).histogram()
+    # The most common level is the paper
+    background = histogram.index(max(histogram))
+    ink = sum(count for level, count in enumerate(histogram) if abs(level - background) > BLANK_INK_CONTRAST)
+    return ink <= gray.width * gray.height * BLANK_MAX_INK
+
+
+def _text_layer(page):
+    """The page's extracted text, or None if it has too little or badly encoded text"""
+    text = page.get_text("text").strip()
+    # Fonts without a usable Unicode mapping (common with Indic scripts) come out as U+FFFD
+    if len(text) < TEXT_LAYER_MIN_CHARS or "\ufffd" in text:
+        return None
+    return text
+
+
+def _iter_rendered_pages(pdf_path, first_page, last_page, prefer_text=False):
+    """
+    Render a range of pages to JPEG or PNG images, one page at a time
+    
+    Args:
+        pdf_path: Path to the PDF file
+        first_page: First page to render (1-based)
+        last_page: Last page to render (inclusive)
+        prefer_text: Return the text layer instead of an image for pages that have one
+    
+    Yields:
+        dict: {'page_num', 'data', 'mime_type', 'blank', 'text'} for each page, data being
+        the encoded image bytes (None for blank pages and pages with text)
+    """
+    # Each worker opens its own Document; they can't be shared across processes
+    with fitz.open(pdf_path) as doc:
+        for page in doc.pages(first_page - 1, last_page):
+            text = _text_layer(page) if prefer_text else None
+            if text:
+                # Nothing to rasterize
+                yield {
+                    'page_num': page.number + 1,
+                    'data': None,
+                    'mime_type': None,
+                    'blank': False,
+                    'text': text
+                }
+                continue
+            
+            zoom = RENDER_LONG_EDGE_PX / max(page.rect.width, page.rect.height)
+            zoom = min(max(zoom, RENDER_MIN_ZOOM), RENDER_MAX_ZOOM)
+            matrix = fitz.Matrix(zoom, zoom)
+            # Scanned pages are several times smaller as JPEG; text and line art
+            # are smaller (and stay sharp) as PNG. Colour doesn't matter for reading
+            # text, and a greyscale PNG is about a quarter the size of an RGB one.
+            scanned = bool(page.get_images())
+            pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csRGB if scanned else fitz.csGRAY)
+            blank = _is_blank(page, pix)
+            if blank:
+                img_data = None
+                mime_type = None
+            elif scanned:
+                img_data = _encode_jpeg(pix)
+                mime_type = "image/jpeg"
+            else:
+                img_data = pix.tobytes("png")
+                mime_type = "image/png"
+            # Raw bytes; base64 (a third larger) is only built for the request body
+            yield {
+                'page_num': page.number + 1,
+                'data': img_data,
+                'mime_type': mime_type,
+                'blank': blank,
+                'text': None
+            }
+
+
+def _render_pages(pdf_path, first_page, last_page, prefer_text):
+    """Render a range of pages in a worker process"""
+    return list(_iter_rendered_pages(pdf_path, first_page, last_page, prefer_text))
+
+
+def _iter_rendered_pages_parallel(pdf_path, start_page, end_page, workers, prefer_text):
+    """Render short page ranges in worker processes, yielding pages in order"""
+    ranges = (
+        (first, min(first + RENDER_PARALLEL_RANGE_PAGES - 1, end_page))
+        for first in range(start_page, end_page + 1, RENDER_PARALLEL_RANGE_PAGES)
+    )
+    
+    # PyMuPDF holds the GIL while rasterizing; spawn for the same reason as in multilang_pdf_converter
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        # Only a couple of ranges per worker are rendered ahead of the consumer
+        pending = deque(
+            executor.submit(_render_pages, pdf_path, first, last, prefer_text)
+            for first, last in islice(ranges, workers * 2)
+        )
+        while pending:
+            images = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range:
+                pending.append(executor.submit(_render_pages, pdf_path, *next_range, prefer_text))
+            yield from images
+    finally:
+        # If the consumer stops early (cancel, error), don't render ranges nobody will read
+        executor.shutdown(cancel_futures=True)
+
+
+def iter_page_images(pdf_path, start_page, end_page, prefer_text=False):
+    """
+    Convert PDF pages to JPEG or PNG images lazily, using several processes for long ranges
+    
+    Pages are rendered only a little ahead of the consumer, so memory use
+    doesn't grow with the number of pages.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        start_page: First page to convert (1-based)
+        end_page: Last page to convert (inclusive)
+        prefer_text: Return the text layer instead of an image for pages that have one
+    
+    Yields:
+        dict: {'page_num', 'data', 'mime_type', 'blank', 'text'} for each page, in page order
+    """
+    next_page = start_page
+    page_count = end_page - start_page + 1
+    workers = min(os.cpu_count() or 1, RENDER_PARALLEL_MAX_WORKERS, -(-page_count // RENDER_PARALLEL_RANGE_PAGES))
+    if page_count >= RENDER_PARALLEL_MIN_PAGES and workers >= 2:
+        try:
+            for image in _iter_rendered_pages_parallel(pdf_path, start_page, end_page, workers, prefer_text):
+                next_page = image['page_num'] + 1
+                yield image
+        except (OSError, BrokenProcessPool):
+            pass  # Render whatever is left in this process
+    
+    if next_page <= end_page:
+        yield from _iter_rendered_pages(pdf_path, next_page, end_page, prefer_text)
@@ -1,12 +1,24 @@
 import streamlit as st
 import fitz  # PyMuPDF
 import base64
+import hashlib
+import json
+import math
+import random
+import re
 import requests
 import os
+import queue
+import shutil
 from dotenv import load_dotenv
 import time
 import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from itertools import islice
 from multilang_pdf_converter import txt_to_pdf_multilang
+from pdf_page_renderer import iter_page_images
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +32,28 @@ if 'uploaded_filename' not in st.session_state:
     st.session_state.uploaded_filename = ""
 if 'target_lang' not in st.session_state:
     st.session_state.target_lang = ""
+if 'pdf_doc' not in st.session_state:
+    st.session_state.pdf_doc = None
+if 'translation_job' not in st.session_state:
+    st.session_state.translation_job = None
+if 'translation_note' not in st.session_state:
+    st.session_state.translation_note = None
+
+def close_uploaded_pdf():
+    """Close the PDF kept open for the current upload and delete its temp file"""
+    # A running translation of the old file is no longer wanted
+    if st.session_state.translation_job is not None:
+        st.session_state.translation_job.cancel()
+        st.session_state.translation_job = None
+    
+    if st.session_state.pdf_doc is not None:
+        st.session_state.pdf_doc.close()
+        st.session_state.pdf_doc = None
+        st.session_state.pdf_file_id = None
+        try:
+            os.remove(st.session_state.pdf_path)
+        except OSError:
+            pass
 
 # Page config
 st.set_page_config(
@@ -109,12 +143,44 @@ with st.sidebar:
     
     # Rate limiting
     st.subheader("⏱️ Rate Limiting")
-    wait_time = st.slider(
-        "Wait time between pages (seconds)",
-        min_value=5,
-        max_value=60,
-        value=15,
-        help="Increase for free models to avoid rate limits"
+    requests_per_minute = st.slider(
+        "Requests per minute",
+        min_value=1,
+        max_value=120,
+        value=10,
+        help="Lower for free models to avoid rate limits. Halved automatically after a rate-limit error, then restored gradually"
+    )
+    
+    tokens_per_minute = st.number_input(
+        "Tokens per minute",
+        min_value=5000,
+        max_value=2000000,
+        value=100000,
+        step=10000,
+        help="Token quota of your OpenRouter plan; each page counts as about 1500 tokens"
+    )
+    
+    max_parallel = st.slider(
+        "Parallel requests",
+        min_value=1,
+        max_value=8,
+        value=3,
+        help="Pages translated at the same time, within the limits above"
+    )
+    
+    pages_per_request = st.slider(
+        "Pages per request",
+        min_value=1,
+        max_value=8,
+        value=1,
+        help="Send several pages in one request to save requests per minute. Lower it if pages come back merged or missing"
+    )
+    
+    prefer_text = st.checkbox(
+        "Use the PDF's text layer",
+        value=False,
+        help="Translate pages that contain selectable text from that text instead of an image: much faster and cheaper. "
+             "Leave it off if the text copied from the PDF looks garbled (common with Indic scripts)"
     )
 
 # Main content area
@@ -136,15 +202,25 @@ with col2:
 
 # Page selection
 if uploaded_file:
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.read())
-        pdf_path = tmp_file.name
+    # Save and open each upload once; reruns reuse the open document
+    if st.session_state.get('pdf_file_id') != uploaded_file.file_id:
+        close_uploaded_pdf()
+        
+        # Save uploaded file temporarily
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+            # Copy in 1 MB chunks rather than reading the whole book into memory
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, tmp_file, length=1024 * 1024)
+        
+        st.session_state.pdf_path = tmp_file.name
+        st.session_state.pdf_doc = fitz.open(tmp_file.name)
+        st.session_state.pdf_file_id = uploaded_file.file_id
+    
+    pdf_path = st.session_state.pdf_path
+    doc = st.session_state.pdf_doc
     
     # Get total pages
-    doc = fitz.open(pdf_path)
     total_pages = len(doc)
-    doc.close()
     
     st.success(f"✅ PDF loaded successfully: {total_pages} pages")
     
@@ -208,55 +284,60 @@ if uploaded_file:
         else:
             estimated_cost = pages_to_translate * 0.01  # Rough estimate
             st.info(f"💰 Estimated cost: ${estimated_cost:.2f} - ${estimated_cost * 2:.2f}")
+else:
+    # Upload was removed
+    close_uploaded_pdf()
+
+# Finished translations are kept on disk, so translating the same pages again costs nothing
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".translation_cache")
+
+def translation_cache_path(image_data, model_id, source_lang, target_lang):
+    """Cache file for a page image translated with a model between two languages"""
+    key = hashlib.sha256(image_data)
+    key.update(f"\0{model_id}\0{source_lang}\0{target_lang}".encode('utf-8'))
+    return os.path.join(CACHE_DIR, key.hexdigest() + ".json")
+
+def load_cached_translation(cache_path):
+    """Return (translation, detected_lang) from the cache, or None if not cached"""
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached['translation'], cached['detected_lang']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached_translation(cache_path, translation, detected_lang):
+    """Store a translation in the cache; failures only cost a future cache miss"""
+    # Write to a temp file first so parallel requests never see a partial entry
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'translation': translation, 'detected_lang': detected_lang}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
 
 # Translation functions
-def pdf_to_images(pdf_path, start_page, end_page):
-    """Convert PDF pages to images"""
-    images = []
-    doc = fitz.open(pdf_path)
-    
-    for page_num in range(start_page - 1, end_page):
-        page = doc[page_num]
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        img_data = pix.tobytes("png")
-        img_base64 = base64.b64encode(img_data).decode('utf-8')
-        images.append({
-            'page_num': page_num + 1,
-            'data': img_base64
-        })
-    
-    doc.close()
-    return images
-
-def translate_image(image_base64, page_num, model_id, api_key, source_lang, target_lang, retry_count=3):
-    """Translate text in image with retry logic"""
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Adjust prompt based on auto-detect
-    if source_lang == "Auto-detect":
-        lang_instruction = f"""First, detect the language in this image.
+def image_data_url(image_data, mime_type):
+    """Inline (base64) URL for an encoded page image"""
+    return f"data:{mime_type};base64,{base64.b64encode(image_data).decode('ascii')}"
+
+@lru_cache(maxsize=32)
+def translation_prompt(source_lang, target_lang, page_count=1):
+    """Instructions for translating one page image, or several in one request (built once per combination)"""
+    if page_count == 1:
+        # Adjust prompt based on auto-detect
+        if source_lang == "Auto-detect":
+            lang_instruction = f"""First, detect the language in this image.
 Then translate the text to {target_lang}.
 
 Format your response EXACTLY like this:
 [DETECTED: language_name]
 translated text here"""
-    else:
-        lang_instruction = f"This image contains {source_lang} text. Translate it to {target_lang}."
-    print(lang_instruction)
-    payload = {
-        "model": model_id,
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"""You are an expert translator. {lang_instruction}
+        else:
+            lang_instruction = f"This image contains {source_lang} text. Translate it to {target_lang}."
+        return f"""You are an expert translator. {lang_instruction}
 
 Please:
 1. Read and extract ALL the text from this image
@@ -265,141 +346,595 @@ Please:
 4. Preserve the meaning, tone, and cultural context
 
 Provide ONLY the {target_lang} translation without any additional explanations."""
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        }
-                    }
-                ]
+    
+    if source_lang == "Auto-detect":
+        lang_instruction = f"First, detect the language in each image. Then translate its text to {target_lang}."
+        page_format = "[DETECTED: language_name]\ntranslated text here"
+    else:
+        lang_instruction = f"These images contain {source_lang} text. Translate it to {target_lang}."
+        page_format = "translated text here"
+    sections = "\n".join(f"=== PAGE {k} ===\n{page_format}" for k in range(1, page_count + 1))
+    return f"""You are an expert translator. There are {page_count} images, each one a separate page. {lang_instruction}
+
+Please, for each image:
+1. Read and extract ALL the text from the image
+2. Translate it accurately to {target_lang}
+3. Maintain the original structure, paragraphs, and formatting
+4. Preserve the meaning, tone, and cultural context
+
+Format your response EXACTLY like this, with one section per image in the order given:
+{sections}
+
+Provide ONLY the {target_lang} translations without any additional explanations."""
+
+@lru_cache(maxsize=32)
+def text_translation_prompt(source_lang, target_lang):
+    """Instructions for translating a page's extracted text, which follows as a separate part"""
+    if source_lang == "Auto-detect":
+        lang_instruction = f"""First, detect the language of the page text below.
+Then translate it to {target_lang}.
+
+Format your response EXACTLY like this:
+[DETECTED: language_name]
+translated text here"""
+    else:
+        lang_instruction = f"The page text below is in {source_lang}. Translate it to {target_lang}."
+    return f"""You are an expert translator. {lang_instruction}
+
+Please:
+1. Translate ALL of the text accurately to {target_lang}
+2. Maintain the original structure and paragraphs (line breaks may come from the page layout)
+3. Preserve the meaning, tone, and cultural context
+
+Provide ONLY the {target_lang} translation without any additional explanations."""
+
+def request_translation(content, model_id, api_key, max_tokens, tokens, retry_count=5, rate_limiter=None, session=None, cancel_event=None):
+    """Send one chat completion request with retry logic; returns (response text, error)"""
+    url = "https://openrouter.ai/api/v1/chat/completions"
+    
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "model": model_id,
+        "messages": [
+            {
+                "role": "user",
+                "content": content
             }
         ],
         "temperature": 0.3,
-        "max_tokens": 4000
+        "max_tokens": max_tokens
     }
+    # Serialize the (image-heavy) body once; json= would redo it on every retry
+    body = json.dumps(payload).encode('utf-8')
     
+    last_response = None
     for attempt in range(retry_count):
         try:
             if attempt > 0:
-                wait = 10 * (attempt + 1)
-                time.sleep(wait)
+                if wait_or_cancel(retry_delay(attempt, last_response), cancel_event):
+                    return None, TRANSLATION_CANCELLED
+                last_response = None
+            
+            if rate_limiter and not rate_limiter.acquire(tokens, cancel_event):
+                return None, TRANSLATION_CANCELLED
+            # Waiting for the budget can take minutes; don't spend it after a cancel
+            if cancel_event is not None and cancel_event.is_set():
+                return None, TRANSLATION_CANCELLED
             
-            response = requests.post(url, headers=headers, json=payload, timeout=120)
+            response = (session or requests).post(url, headers=headers, data=body, timeout=120)
             
             if response.status_code == 404:
-                return None, None, f"Model '{model_id}' not found. Please select a different model."
+                return None, f"Model '{model_id}' not found. Please select a different model."
             elif response.status_code == 429:
+                if rate_limiter:
+                    rate_limiter.slow_down()
                 if attempt < retry_count - 1:
+                    last_response = response
                     continue
-                return None, None, "Rate limit exceeded. Please increase wait time or add credits."
+                return None, "Rate limit exceeded. Please lower requests per minute or add credits."
             
             response.raise_for_status()
             result = response.json()
-            translation = result['choices'][0]['message']['content']
-            
-            # Extract detected language if present
-            detected_lang = None
-            if "[DETECTED:" in translation:
-                try:
-                    detected_part = translation.split("[DETECTED:")[1].split("]")[0].strip()
-                    detected_lang = detected_part
-                    # Remove the detection marker from translation
-                    translation = translation.split("]", 1)[1].strip()
-                except:
-                    pass
-            
-            return translation, detected_lang, None
+            return result['choices'][0]['message']['content'], None
             
         except requests.exceptions.HTTPError as e:
-            if attempt < retry_count - 1:
+            # Other client errors (bad key, bad request) fail the same way on every retry
+            if e.response.status_code >= 500 and attempt < retry_count - 1:
+                last_response = e.response
                 continue
-            return None, None, f"HTTP Error {e.response.status_code}"
+            return None, f"HTTP Error {e.response.status_code}"
         except Exception as e:
             if attempt < retry_count - 1:
                 continue
-            return None, None, str(e)
+            return None, str(e)
+    
+    return None, "All retry attempts failed"
+
+# Language marker the model writes before an auto-detected translation
+DETECTED_LANGUAGE_RE = re.compile(r"\[DETECTED:\s*([^\]]*)\]\s*")
+
+def split_detected_language(translation):
+    """Separate the [DETECTED: language] marker from a translation; returns (translation, detected_lang)"""
+    match = DETECTED_LANGUAGE_RE.search(translation)
+    if not match:
+        return translation, None
+    # Remove the detection marker (and anything written before it) from translation
+    return translation[match.end():].strip(), match.group(1).strip()
+
+def translate_cached(cache_data, make_content, model_id, api_key, source_lang, target_lang, retry_count=5, rate_limiter=None, session=None, cancel_event=None):
+    """Translate one page through the cache; make_content builds the request content on a cache miss. Returns (translation, detected_lang, error)"""
+    cache_path = translation_cache_path(cache_data, model_id, source_lang, target_lang)
+    cached = load_cached_translation(cache_path)
+    if cached:
+        return cached[0], cached[1], None
+    
+    translation, error = request_translation(
+        make_content(), model_id, api_key, MAX_TOKENS_PER_PAGE, ESTIMATED_TOKENS_PER_PAGE,
+        retry_count=retry_count, rate_limiter=rate_limiter, session=session, cancel_event=cancel_event
+    )
+    if error:
+        return None, None, error
+    
+    translation, detected_lang = split_detected_language(translation)
+    save_cached_translation(cache_path, translation, detected_lang)
+    return translation, detected_lang, None
+
+def translate_image(image_data, page_num, model_id, api_key, source_lang, target_lang, retry_count=5, rate_limiter=None, mime_type="image/png", session=None, cancel_event=None):
+    """Translate text in image with retry logic"""
+    def make_content():
+        return [
+            {
+                "type": "text",
+                "text": translation_prompt(source_lang, target_lang)
+            },
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": image_data_url(image_data, mime_type)
+                }
+            }
+        ]
+    
+    return translate_cached(
+        image_data, make_content, model_id, api_key, source_lang, target_lang,
+        retry_count=retry_count, rate_limiter=rate_limiter, session=session, cancel_event=cancel_event
+    )
+
+def translate_text(text, model_id, api_key, source_lang, target_lang, retry_count=5, rate_limiter=None, session=None, cancel_event=None):
+    """Translate a page's extracted text with retry logic"""
+    def make_content():
+        return [
+            {
+                "type": "text",
+                "text": text_translation_prompt(source_lang, target_lang)
+            },
+            {
+                "type": "text",
+                "text": text
+            }
+        ]
+    
+    return translate_cached(
+        text.encode('utf-8'), make_content, model_id, api_key, source_lang, target_lang,
+        retry_count=retry_count, rate_limiter=rate_limiter, session=session, cancel_event=cancel_event
+    )
+
+# Stands in for the translation of pages the renderer found blank
+BLANK_PAGE_TEXT = "[Blank page]"
+
+def translate_page_group(images, model_id, api_key, source_lang, target_lang, rate_limiter=None, session=None, cancel_event=None):
+    """Translate several page images in one request; returns a (page_num, translation, detected_lang, error) tuple per page"""
+    results = {}
+    cache_paths = {}
+    uncached = []
+    text_pages = []
+    for img in images:
+        if img['blank']:
+            # Nothing to translate, so no request (or rate limit budget) is spent on it
+            results[img['page_num']] = (img['page_num'], BLANK_PAGE_TEXT, None, None)
+            continue
+        if img['text']:
+            text_pages.append(img)
+            continue
+        cache_paths[img['page_num']] = translation_cache_path(img['data'], model_id, source_lang, target_lang)
+        cached = load_cached_translation(cache_paths[img['page_num']])
+        if cached:
+            results[img['page_num']] = (img['page_num'], cached[0], cached[1], None)
+        else:
+            uncached.append(img)
+    
+    sections = None
+    if len(uncached) > 1:
+        content = [{"type": "text", "text": translation_prompt(source_lang, target_lang, len(uncached))}]
+        content += [
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": image_data_url(img['data'], img['mime_type'])
+                }
+            }
+            for img in uncached
+        ]
+        text, error = request_translation(
+            content, model_id, api_key,
+            min(MAX_TOKENS_PER_PAGE * len(uncached), MAX_TOKENS_PER_REQUEST),
+            ESTIMATED_TOKENS_PER_PAGE * len(uncached),
+            rate_limiter=rate_limiter, session=session, cancel_event=cancel_event
+        )
+        # The base64 copies of the whole group aren't needed for the per-page fallback
+        del content
+        if error:
+            for img in uncached:
+                results[img['page_num']] = (img['page_num'], None, None, error)
+            uncached = []
+        else:
+            sections = split_page_sections(text, len(uncached))
+    
+    for i, img in enumerate(uncached):
+        if sections:
+            translation, detected_lang = split_detected_language(sections[i])
+            save_cached_translation(cache_paths[img['page_num']], translation, detected_lang)
+            error = None
+        else:
+            # Single page, or the model didn't return one section per image
+            translation, detected_lang, error = translate_image(
+                img['data'], img['page_num'], model_id, api_key, source_lang, target_lang,
+                rate_limiter=rate_limiter, mime_type=img['mime_type'], session=session,
+                cancel_event=cancel_event
+            )
+        results[img['page_num']] = (img['page_num'], translation, detected_lang, error)
+        # The group stays referenced until the task ends; free each image once its page is done
+        img['data'] = None
+    
+    # Pages read from the text layer are cheap to send one by one
+    for img in text_pages:
+        translation, detected_lang, error = translate_text(
+            img['text'], model_id, api_key, source_lang, target_lang,
+            rate_limiter=rate_limiter, session=session, cancel_event=cancel_event
+        )
+        results[img['page_num']] = (img['page_num'], translation, detected_lang, error)
+    
+    return [results[img['page_num']] for img in images]
+
+# Section headers the model writes between pages of a multi-page request
+PAGE_SECTION_RE = re.compile(r"^=== PAGE (\d+) ===[ \t]*$", re.MULTILINE)
+
+def split_page_sections(text, page_count):
+    """Split a multi-page response into per-page texts, or None if it doesn't have exactly one section per page"""
+    parts = PAGE_SECTION_RE.split(text)
+    numbers = parts[1::2]
+    if numbers != [str(k) for k in range(1, page_count + 1)]:
+        return None
+    return [section.strip() for section in parts[2::2]]
+
+# Bounds (seconds) for the exponential backoff between retries
+RETRY_MIN_WAIT = 1
+RETRY_MAX_WAIT = 60
+
+def retry_delay(attempt, response=None):
+    """Seconds to wait before a retry: the server's Retry-After if given, else exponential backoff with jitter"""
+    if response is not None:
+        try:
+            retry_after = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            retry_after = None  # Missing, or an HTTP date
+        # Ignore nan/inf; a negative value just means "now"
+        if retry_after is not None and math.isfinite(retry_after):
+            return min(max(0.0, retry_after), RETRY_MAX_WAIT)
+    # Full jitter keeps parallel requests from retrying in lockstep
+    return random.uniform(RETRY_MIN_WAIT, min(RETRY_MAX_WAIT, RETRY_MIN_WAIT * 2 ** attempt))
+
+# Error for requests given up because the job was cancelled; those pages aren't reported
+TRANSLATION_CANCELLED = "Cancelled"
+
+def wait_or_cancel(seconds, cancel_event=None):
+    """Sleep, waking early if cancel_event is set; returns True if cancelled"""
+    if cancel_event is None:
+        time.sleep(seconds)
+        return False
+    return cancel_event.wait(seconds)
+
+# Rough token cost of one page request (image + prompt), used for the tokens-per-minute budget
+ESTIMATED_TOKENS_PER_PAGE = 1500
+
+# Response length allowed per page, and per request when several pages are sent together
+MAX_TOKENS_PER_PAGE = 4000
+MAX_TOKENS_PER_REQUEST = 16000
+
+# A burst of rate-limit errors (one per parallel request) only halves the limits once
+# per this many seconds; after it, they recover by a share of the user's setting per minute
+SLOW_DOWN_COOLDOWN = 60
+LIMIT_RECOVERY_PER_MINUTE = 0.1
+
+class RateLimiter:
+    """Token bucket for requests and tokens per minute, shared by the worker threads"""
+    
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.available_requests = requests_per_minute
+        self.available_tokens = tokens_per_minute
+        self.last_refill = time.monotonic()
+        self.last_slow_down = None
+        self.lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        if self.last_slow_down is not None and now - self.last_slow_down >= SLOW_DOWN_COOLDOWN:
+            # Creep back toward the user's limits while no rate-limit errors come in
+            recovery = elapsed / 60 * LIMIT_RECOVERY_PER_MINUTE
+            self.requests_per_minute = min(
+                self.max_requests_per_minute,
+                self.requests_per_minute + recovery * self.max_requests_per_minute
+            )
+            self.tokens_per_minute = min(
+                self.max_tokens_per_minute,
+                self.tokens_per_minute + recovery * self.max_tokens_per_minute
+            )
+        self.available_requests = min(
+            self.requests_per_minute,
+            self.available_requests + elapsed * self.requests_per_minute / 60
+        )
+        self.available_tokens = min(
+            self.tokens_per_minute,
+            self.available_tokens + elapsed * self.tokens_per_minute / 60
+        )
+    
+    def acquire(self, tokens, cancel_event=None):
+        """Block until one request and the given tokens fit in the budget, then take them; returns False if cancelled first"""
+        while True:
+            with self.lock:
+                self._refill()
+                # A request bigger than the whole budget waits for a full bucket; re-capped
+                # each pass since slow_down may have lowered the budget in the meantime
+                needed = min(tokens, self.tokens_per_minute)
+                if self.available_requests >= 1 and self.available_tokens >= needed:
+                    self.available_requests -= 1
+                    self.available_tokens -= needed
+                    return True
+                # Sleep until the scarcer budget has refilled enough
+                wait = max(
+                    (1 - self.available_requests) * 60 / self.requests_per_minute,
+                    (needed - self.available_tokens) * 60 / self.tokens_per_minute
+                )
+            if wait_or_cancel(wait, cancel_event):
+                return False
+    
+    def slow_down(self):
+        """Halve the limits after a rate-limit response, at most once per cooldown"""
+        with self.lock:
+            self._refill()
+            now = time.monotonic()
+            if self.last_slow_down is None or now - self.last_slow_down >= SLOW_DOWN_COOLDOWN:
+                self.last_slow_down = now
+                self.requests_per_minute = max(1, self.requests_per_minute / 2)
+                self.tokens_per_minute = max(ESTIMATED_TOKENS_PER_PAGE, self.tokens_per_minute / 2)
+            # Either way, the server wants a pause before the next request
+            self.available_requests = min(self.available_requests, 0)
+            self.available_tokens = min(self.available_tokens, self.tokens_per_minute)
+
+
+# A job whose session hasn't polled it for this many seconds (tab closed) cancels itself
+JOB_ABANDON_TIMEOUT = 30
+
+class TranslationJob:
+    """Translation of a page range running in a background thread, so reruns (and Cancel) stay responsive"""
+    
+    def __init__(self, pdf_path, start_page, end_page, model_id, api_key, source_lang, target_lang,
+                 requests_per_minute, tokens_per_minute, max_parallel, pages_per_request, prefer_text):
+        self.page_count = end_page - start_page + 1
+        self.target_lang = target_lang
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.error = None
+        
+        # Filled from the queue by poll(), on the script thread only
+        self.translations = {}
+        self.failed_pages = []
+        self.detected_languages = []
+        self.finished = False
+        self.last_poll = time.monotonic()
+        
+        self.thread = threading.Thread(
+            target=self._run,
+            args=(pdf_path, start_page, end_page, model_id, api_key, source_lang, target_lang,
+                  requests_per_minute, tokens_per_minute, max_parallel, pages_per_request, prefer_text),
+            daemon=True
+        )
+        self.thread.start()
+    
+    def _run(self, pdf_path, start_page, end_page, model_id, api_key, source_lang, target_lang,
+             requests_per_minute, tokens_per_minute, max_parallel, pages_per_request, prefer_text):
+        # Pages are rendered to images lazily, as translation slots free up. This opens its
+        # own Document; the one in session_state belongs to the script thread.
+        images = iter_page_images(pdf_path, start_page, end_page, prefer_text)
+        
+        # Translate pages in parallel within the per-minute request and token budget
+        rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        
+        # Keep-alive connections shared by the worker threads, so only the first
+        # request per connection pays for the TLS handshake. Plain requests/urllib3
+        # on purpose: httpx's pool is known to lose throughput at high concurrency.
+        session = requests.Session()
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=max_parallel))
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                futures = set()
+                try:
+                    while True:
+                        if self.cancel_event.is_set():
+                            # Drop requests that haven't started; running ones stop before their next send
+                            futures = {future for future in futures if not future.cancel()}
+                        
+                        # Keep only a few rendered pages in memory instead of the whole book
+                        while len(futures) < max_parallel * 2 and not self.cancel_event.is_set():
+                            group = list(islice(images, pages_per_request))
+                            if not group:
+                                break
+                            futures.add(executor.submit(
+                                translate_page_group,
+                                group,
+                                model_id,
+                                api_key,
+                                source_lang,
+                                target_lang,
+                                rate_limiter=rate_limiter,
+                                session=session,
+                                cancel_event=self.cancel_event
+                            ))
+                        if not futures:
+                            break
+                        
+                        # Wake up now and then to notice when nobody is polling any more
+                        finished, futures = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                        if time.monotonic() - self.last_poll > JOB_ABANDON_TIMEOUT:
+                            self.cancel_event.set()
+                        self.error = self._collect(finished)
+                        if self.error:
+                            break
+                except Exception as e:
+                    # Rendering failed
+                    self.error = str(e)
+                
+                if self.error:
+                    # Send nothing more, but keep the pages the running groups still finish
+                    self.cancel_event.set()
+                    futures = {future for future in futures if not future.cancel()}
+                    self._collect(wait(futures).done)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            images.close()
+            session.close()
+            self.results.put(None)  # Done
+    
+    def _collect(self, futures):
+        """Queue the pages of finished group tasks; returns the first task's error, if any"""
+        error = None
+        for future in futures:
+            try:
+                pages = future.result()
+            except Exception as e:
+                error = error or str(e)
+                continue
+            for page in pages:
+                # Pages given up on cancel are left out, like the ones never started
+                if page[3] != TRANSLATION_CANCELLED:
+                    self.results.put(page)
+        return error
+    
+    def poll(self):
+        """Collect the pages translated since the last call; returns True once the job is done"""
+        self.last_poll = time.monotonic()
+        while not self.finished:
+            try:
+                page = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            if page is None:
+                self.finished = True
+                break
+            
+            page_num, translation, detected_lang, error = page
+            if translation:
+                self.translations[page_num] = f"\n--- Page {page_num} ---\n{translation}"
+                if detected_lang:
+                    self.detected_languages.append(detected_lang)
+            else:
+                self.translations[page_num] = f"\n--- Page {page_num} ---\n[Translation failed: {error}]"
+                self.failed_pages.append((page_num, error))
+        
+        return self.finished
     
-    return None, None, "All retry attempts failed"
+    def cancel(self):
+        """Stop sending requests; responses already on their way are still collected"""
+        self.cancel_event.set()
 
 
 # Start translation button
 if uploaded_file and api_key:
     st.divider()
     
-    # Only show start button if translation is not complete
-    if not st.session_state.translation_complete:
-        if st.button("🚀 Start Translation", type="primary", use_container_width=True):
-            # Progress tracking
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Convert pages to images
-            status_text.text("📸 Converting PDF pages to images...")
-            images = pdf_to_images(pdf_path, start_page, end_page)
-            
-            # Translate each page
-            all_translations = []
-            failed_pages = []
-            detected_languages = []
-            
-            for i, img in enumerate(images):
-                page_num = img['page_num']
-                progress = (i + 1) / len(images)
-                
-                status_text.text(f"🔄 Translating page {page_num}/{end_page}...")
-                progress_bar.progress(progress)
-                
-                # Add wait time between pages (except first page)
-                if i > 0:
-                    status_text.text(f"⏳ Waiting {wait_time} seconds to avoid rate limits...")
-                    time.sleep(wait_time)
-                    status_text.text(f"🔄 Translating page {page_num}/{end_page}...")
-                
-                translation, detected_lang, error = translate_image(
-                    img['data'],
-                    page_num,
-                    model_options[selected_model],
-                    api_key,
-                    source_lang,
-                    target_lang
-                )
-                
-                if translation:
-                    all_translations.append(f"\n--- Page {page_num} ---\n{translation}")
-                    if detected_lang:
-                        detected_languages.append(detected_lang)
-                else:
-                    all_translations.append(f"\n--- Page {page_num} ---\n[Translation failed: {error}]")
-                    failed_pages.append(page_num)
-                    st.error(f"❌ Page {page_num} failed: {error}")
+    job = st.session_state.translation_job
+    if job is not None:
+        # Show the background translation's progress; the script reruns every second while it runs
+        done = job.poll()
+        for page_num, error in job.failed_pages:
+            st.error(f"❌ Page {page_num} failed: {error}")
+        st.progress(len(job.translations) / job.page_count)
+        
+        if not done:
+            if job.cancel_event.is_set():
+                st.text("⏹️ Cancelling, waiting for requests already sent to finish...")
+            else:
+                st.text(f"🔄 Translated {len(job.translations)}/{job.page_count} page(s)...")
+                if st.button("⏹️ Cancel Translation", use_container_width=True):
+                    job.cancel()
+                    st.rerun()
+        else:
+            all_translations = [job.translations[page_num] for page_num in sorted(job.translations)]
             
             # Combine translations and store in session state
             st.session_state.final_translation = "\n".join(all_translations)
             st.session_state.uploaded_filename = uploaded_file.name
-            st.session_state.target_lang = target_lang
+            st.session_state.target_lang = job.target_lang
             st.session_state.translation_complete = True
-            st.session_state.failed_pages = failed_pages
-            st.session_state.total_pages = len(images)
+            st.session_state.failed_pages = sorted(page_num for page_num, _ in job.failed_pages)
+            st.session_state.total_pages = len(job.translations)
+            st.session_state.translation_job = None
+            
+            if job.error:
+                st.session_state.translation_note = f"❌ Translation stopped after {len(job.translations)} of {job.page_count} pages: {job.error}"
+            elif len(job.translations) < job.page_count:
+                st.session_state.translation_note = f"⏹️ Translation cancelled after {len(job.translations)} of {job.page_count} pages"
+            else:
+                st.session_state.translation_note = None
             
             # Store detected language
-            if detected_languages:
+            if job.detected_languages:
                 # Get most common detected language
-                most_common = max(set(detected_languages), key=detected_languages.count)
+                most_common = max(set(job.detected_languages), key=job.detected_languages.count)
                 st.session_state.detected_language = most_common
             else:
                 st.session_state.detected_language = None
             
-            # Success
-            progress_bar.progress(1.0)
-            status_text.text("✅ Translation complete!")
-            
+            st.rerun()
+    elif not st.session_state.translation_complete:
+        # Only show start button if translation is not complete
+        if st.button("🚀 Start Translation", type="primary", use_container_width=True):
+            st.session_state.translation_job = TranslationJob(
+                pdf_path,
+                start_page,
+                end_page,
+                model_options[selected_model],
+                api_key,
+                source_lang,
+                target_lang,
+                requests_per_minute,
+                tokens_per_minute,
+                max_parallel,
+                pages_per_request,
+                prefer_text
+            )
             st.rerun()
 
 # Display translation results if available
 if st.session_state.translation_complete:
     st.divider()
     
+    if st.session_state.translation_note:
+        st.warning(st.session_state.translation_note)
+    
     # Show detected language if auto-detect was used
     if st.session_state.get('detected_language'):
         st.info(f"🔍 **Detected Language:** {st.session_state.detected_language}")
@@ -508,4 +1043,11 @@ st.markdown("""
     <p><strong>Smart PDF Translator</strong> | Built with Streamlit & OpenRouter AI</p>
     <p><small>Get your API key at <a href='https://openrouter.ai/keys' target='_blank'>openrouter.ai/keys</a></small></p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Keep refreshing the page while a translation runs in the background
+if st.session_state.translation_job is not None:
+    # Also keeps the job alive while the progress section isn't shown
+    st.session_state.translation_job.poll()
+    time.sleep(1)
+    st.rerun()
\ No newline at end of file